@@ -10,6 +10,8 @@ import json
 import logging
 import asyncio
 import hashlib
+import heapq
+import math
 import feedparser
 from datetime import datetime, timezone, timedelta
 from typing import List, Dict, Optional
@@ -38,6 +40,12 @@ UTC_PLUS_8 = timezone(timedelta(hours=8))
 STATE_FILE = "rss_state.json"
 CONFIG_FILE = "rss_config.json"
 
+# 投递队列默认配置
+DEFAULT_MAX_PER_CYCLE = 20
+DEFAULT_WEIGHT_BOOST_HOURS = 1.0
+DEFAULT_BACKLOG_SHARE = 0.25
+DEFAULT_MAX_QUEUE_SIZE = 1000
+
 @dataclass
 class RSSItem:
     """RSS项目数据结构"""
@@ -46,12 +54,145 @@ class RSSItem:
     published: datetime
     summary: str
     source: str
+    weight: float = 1.0  # 所属订阅源的权重，用于投递优先级
     
     def to_hash(self) -> str:
         """生成项目哈希值用于重复检测"""
         content = f"{self.title}{self.link}"
         return hashlib.md5(content.encode('utf-8')).hexdigest()
 
+class DeliveryQueue:
+    """投递队列
+
+    按新鲜度和订阅源权重维护优先级索引，每轮最多取出固定数量的项目，
+    其中一部分名额留给队列中最旧的项目，使积压在后续轮次中逐步消化，
+    同时保证新内容不会被旧积压阻塞。
+    """
+    
+    def __init__(self, max_per_cycle: int = DEFAULT_MAX_PER_CYCLE,
+                 max_age_hours: Optional[float] = None,
+                 weight_boost_hours: float = DEFAULT_WEIGHT_BOOST_HOURS,
+                 backlog_share: float = DEFAULT_BACKLOG_SHARE,
+                 max_queue_size: int = DEFAULT_MAX_QUEUE_SIZE):
+        self.max_per_cycle = max_per_cycle  # 0 表示不限制
+        self.max_age_hours = max_age_hours  # None 表示不因排队过久而丢弃
+        self.weight_boost_hours = weight_boost_hours  # 每单位权重相当于提前的小时数
+        self.backlog_share = backlog_share  # 每轮留给最旧项目的名额比例
+        self.max_queue_size = max_queue_size  # 0 表示不限制
+        # 两个堆共享同一批条目：_fresh_heap 取最新，_backlog_heap 取最旧，
+        # 已取出的条目从 _entries 中删除，堆中残留的记录在弹出时跳过
+        self._fresh_heap = []
+        self._backlog_heap = []
+        self._entries = {}
+        self._counter = 0
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def _priority(self, item: RSSItem) -> float:
+        """计算优先级，值越小越先发送"""
+        boost = (item.weight - 1.0) * self.weight_boost_hours * 3600
+        return -(item.published.timestamp() + boost)
+    
+    def _is_expired(self, item: RSSItem) -> bool:
+        """检查项目是否已超过最大排队时效"""
+        if self.max_age_hours is None:
+            return False
+        age_limit = datetime.now(timezone.utc) - timedelta(hours=self.max_age_hours)
+        return item.published < age_limit
+    
+    def _pop_from(self, heap: List) -> Optional[RSSItem]:
+        """从指定堆中弹出一个仍在队列中的项目"""
+        while heap:
+            _, count, item_hash = heapq.heappop(heap)
+            entry = self._entries.get(item_hash)
+            if entry is not None and entry[1] == count:
+                del self._entries[item_hash]
+                return entry[2]
+        return None
+    
+    def _peek_oldest_priority(self) -> Optional[float]:
+        """返回队列中最旧项目的优先级"""
+        while self._backlog_heap:
+            _, count, item_hash = self._backlog_heap[0]
+            entry = self._entries.get(item_hash)
+            if entry is not None and entry[1] == count:
+                return entry[0]
+            heapq.heappop(self._backlog_heap)
+        return None
+    
+    def push(self, item: RSSItem) -> bool:
+        """加入队列，已在队列中或已过期的项目会被忽略，队列已满时淘汰最旧的项目"""
+        item_hash = item.to_hash()
+        if item_hash in self._entries or self._is_expired(item):
+            return False
+        
+        priority = self._priority(item)
+        if self.max_queue_size > 0 and len(self._entries) >= self.max_queue_size:
+            if priority >= self._peek_oldest_priority():
+                return False
+            evicted = self._pop_from(self._backlog_heap)
+            logger.warning(f"投递队列已满，丢弃最旧的项目: {evicted.title}")
+        
+        count = self._counter
+        self._counter += 1
+        self._entries[item_hash] = (priority, count, item)
+        heapq.heappush(self._fresh_heap, (priority, count, item_hash))
+        heapq.heappush(self._backlog_heap, (-priority, count, item_hash))
+        self._compact()
+        return True
+    
+    def _compact(self):
+        """堆中残留的已删除记录过多时，根据 _entries 重建两个堆"""
+        if max(len(self._fresh_heap), len(self._backlog_heap)) <= 2 * len(self._entries):
+            return
+        self._fresh_heap = [(priority, count, item_hash)
+                            for item_hash, (priority, count, _) in self._entries.items()]
+        self._backlog_heap = [(-priority, count, item_hash)
+                              for item_hash, (priority, count, _) in self._entries.items()]
+        heapq.heapify(self._fresh_heap)
+        heapq.heapify(self._backlog_heap)
+    
+    def _take(self, heap: List, limit: int, batch: List[RSSItem]) -> int:
+        """从指定堆中取出最多 limit 个未过期的项目，返回丢弃的过期数量"""
+        dropped = 0
+        taken = 0
+        while taken < limit:
+            item = self._pop_from(heap)
+            if item is None:
+                break
+            if self._is_expired(item):
+                dropped += 1
+                continue
+            batch.append(item)
+            taken += 1
+        return dropped
+    
+    def pop_batch(self) -> List[RSSItem]:
+        """按优先级取出本轮要发送的项目，排队期间过期的项目直接丢弃"""
+        if self.max_per_cycle <= 0:
+            limit = len(self._entries)
+            backlog_slots = 0
+        else:
+            limit = self.max_per_cycle
+            # 至少保留一个名额给新内容，只有上限大于1时才为积压保底一个名额
+            backlog_slots = min(limit - 1, math.floor(limit * self.backlog_share))
+            if self.backlog_share > 0 and limit > 1:
+                backlog_slots = max(1, backlog_slots)
+        
+        fresh = []
+        backlog = []
+        dropped = self._take(self._fresh_heap, limit - backlog_slots, fresh)
+        dropped += self._take(self._backlog_heap, backlog_slots, backlog)
+        # 积压不足时把剩余名额还给新内容
+        dropped += self._take(self._fresh_heap, backlog_slots - len(backlog), fresh)
+        
+        if dropped:
+            logger.info(f"丢弃 {dropped} 个排队过期的项目")
+        self._compact()
+        # 积压项目按从旧到新取出，发送时统一按新鲜度排列
+        return fresh + backlog[::-1]
+
 class TelegramBot:
     """Telegram机器人类"""
     
@@ -155,7 +296,14 @@ class RSSManager:
                             "enabled": True
                         }
                     ],
-                    "check_interval": 300  # 5分钟
+                    "check_interval": 300,  # 5分钟
+                    "delivery": {
+                        "max_per_cycle": DEFAULT_MAX_PER_CYCLE,
+                        "max_age_hours": None,
+                        "weight_boost_hours": DEFAULT_WEIGHT_BOOST_HOURS,
+                        "backlog_share": DEFAULT_BACKLOG_SHARE,
+                        "max_queue_size": DEFAULT_MAX_QUEUE_SIZE
+                    }
                 }
                 self._save_config(default_config)
                 return default_config
@@ -190,6 +338,58 @@ class RSSManager:
         except Exception as e:
             logger.error(f"保存状态文件失败: {e}")
     
+    def _get_feed_weight(self, feed_config: Dict) -> float:
+        """读取订阅源权重，无效时回退为默认值"""
+        weight = feed_config.get('weight', 1.0)
+        try:
+            weight = float(weight)
+        except (TypeError, ValueError):
+            weight = None
+        if weight is None or not math.isfinite(weight) or weight <= 0:
+            logger.warning(f"订阅源 {feed_config.get('name')} 的权重无效: {feed_config.get('weight')}，使用默认值 1.0")
+            return 1.0
+        return weight
+    
+    def get_delivery_config(self) -> Dict:
+        """读取并校验投递队列配置，无效值回退为默认值"""
+        delivery_config = self.feeds_config.get('delivery') or {}
+        
+        def read_number(config: Dict, key: str, default, cast, minimum, maximum=None,
+                        allow_none=False, exclusive_minimum=False):
+            value = config.get(key, default)
+            if value is None and allow_none:
+                return None
+            try:
+                if isinstance(value, bool) or not math.isfinite(float(value)):
+                    raise ValueError
+                number = cast(value)
+                if number < minimum or (exclusive_minimum and number == minimum):
+                    raise ValueError
+                if maximum is not None and number > maximum:
+                    raise ValueError
+                return number
+            except (TypeError, ValueError, OverflowError):
+                logger.warning(f"配置项 {key} 无效: {value}，使用默认值 {default}")
+                return default
+        
+        max_age_hours = read_number(delivery_config, 'max_age_hours', None, float, 0,
+                                    allow_none=True, exclusive_minimum=True)
+        
+        # 队列中的项目同样不能超过内容时间限制
+        time_limit_config = self.feeds_config.get('content_time_limit', {})
+        if time_limit_config.get('enabled', False):
+            hours = read_number(time_limit_config, 'hours', 24, float, 0, exclusive_minimum=True)
+            if max_age_hours is None or hours < max_age_hours:
+                max_age_hours = hours
+        
+        return {
+            'max_per_cycle': read_number(delivery_config, 'max_per_cycle', DEFAULT_MAX_PER_CYCLE, int, 0),
+            'max_age_hours': max_age_hours,
+            'weight_boost_hours': read_number(delivery_config, 'weight_boost_hours', DEFAULT_WEIGHT_BOOST_HOURS, float, 0),
+            'backlog_share': read_number(delivery_config, 'backlog_share', DEFAULT_BACKLOG_SHARE, float, 0, 1),
+            'max_queue_size': read_number(delivery_config, 'max_queue_size', DEFAULT_MAX_QUEUE_SIZE, int, 0)
+        }
+    
     def _is_item_within_time_limit(self, published_time: datetime) -> bool:
         """检查项目是否在时间限制范围内"""
         time_limit_config = self.feeds_config.get('content_time_limit', {})
@@ -201,7 +401,7 @@ class RSSManager:
         
         return published_time >= time_limit
     
-    def _parse_feed(self, feed_url: str, feed_name: str = None) -> List[RSSItem]:
+    def _parse_feed(self, feed_url: str, feed_name: str = None, feed_weight: float = 1.0) -> List[RSSItem]:
         """解析RSS订阅源"""
         try:
             feed = feedparser.parse(feed_url)
@@ -242,7 +442,8 @@ class RSSManager:
                         link=entry.link,
                         published=published_utc8,
                         summary=summary,
-                        source=source
+                        source=source,
+                        weight=feed_weight
                     )
                     items.append(item)
                     
@@ -291,10 +492,11 @@ class RSSManager:
                 
             feed_url = feed_config['url']
             feed_name = feed_config['name']
+            feed_weight = self._get_feed_weight(feed_config)
             
             logger.info(f"正在检查RSS源: {feed_name} ({feed_url})")
             
-            items = self._parse_feed(feed_url, feed_name)
+            items = self._parse_feed(feed_url, feed_name, feed_weight)
             for item in items:
                 # 检查项目是否在时间限制范围内
                 if not self._is_item_within_time_limit(item.published):
@@ -358,6 +560,8 @@ class RSSBot:
         self.telegram_bot = TelegramBot(self.telegram_token, self.telegram_chat_id, self.http_proxy)
         self.rss_manager = RSSManager()
         
+        self.delivery_queue = DeliveryQueue(**self.rss_manager.get_delivery_config())
+        
     async def run_once(self):
         """运行一次RSS检查"""
         logger.info("开始RSS订阅检查...")
@@ -365,15 +569,21 @@ class RSSBot:
         try:
             new_items = self.rss_manager.get_new_items()
             
-            if not new_items:
+            # 新项目进入投递队列，已在队列中的项目不会重复加入
+            queued_count = sum(1 for item in new_items if self.delivery_queue.push(item))
+            if queued_count:
+                logger.info(f"发现 {queued_count} 个新的RSS项目")
+            
+            batch = self.delivery_queue.pop_batch()
+            if not batch:
                 logger.info("没有发现新的RSS项目")
                 return
             
-            logger.info(f"发现 {len(new_items)} 个新的RSS项目")
+            logger.info(f"本轮发送 {len(batch)} 个项目，队列剩余 {len(self.delivery_queue)} 个")
             
             # 发送消息到Telegram
             successfully_sent_items = []  # 记录成功发送的项目
-            for item in new_items:
+            for item in batch:
                 message = self.rss_manager.format_telegram_message(item)
                 success = await self.telegram_bot.send_message(message)
                 
@@ -382,6 +592,7 @@ class RSSBot:
                     successfully_sent_items.append(item)  # 只在发送成功时添加到列表
                 else:
                     logger.error(f"发送消息失败: {item.title}")
+                    self.delivery_queue.push(item)  # 失败的项目放回队列，下轮重试
                 
                 # 添加延迟避免Telegram API限制
                 await asyncio.sleep(1)
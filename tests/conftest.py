@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+import sys
+import types
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# 测试只涉及投递队列，未安装 feedparser 时使用占位模块以便导入 main
+try:
+    import feedparser  # noqa: F401
+except ImportError:
+    sys.modules['feedparser'] = types.ModuleType('feedparser')
@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+"""投递队列测试"""
+
+import asyncio
+import json
+from datetime import datetime, timezone, timedelta
+
+import main
+from main import DeliveryQueue, RSSBot, RSSItem, RSSManager
+
+
+def make_item(title: str, hours_ago: float, weight: float = 1.0) -> RSSItem:
+    published = datetime.now(timezone.utc) - timedelta(hours=hours_ago)
+    return RSSItem(
+        title=title,
+        link=f"https://example.com/{title}",
+        published=published,
+        summary="",
+        source="测试源",
+        weight=weight
+    )
+
+
+def titles(items):
+    return [item.title for item in items]
+
+
+def make_manager(tmp_path, config):
+    config_file = tmp_path / "rss_config.json"
+    config_file.write_text(json.dumps(config), encoding='utf-8')
+    return RSSManager(str(config_file))
+
+
+def test_cap_and_freshness_order():
+    queue = DeliveryQueue(max_per_cycle=2, backlog_share=0)
+    for title, hours in [("b", 2), ("a", 1), ("d", 4), ("c", 3)]:
+        queue.push(make_item(title, hours))
+
+    assert titles(queue.pop_batch()) == ["a", "b"]
+    assert titles(queue.pop_batch()) == ["c", "d"]
+    assert queue.pop_batch() == []
+
+
+def test_zero_cap_sends_everything():
+    queue = DeliveryQueue(max_per_cycle=0)
+    for i in range(30):
+        queue.push(make_item(f"item{i}", i))
+
+    assert len(queue.pop_batch()) == 30
+    assert len(queue) == 0
+
+
+def test_weight_boosts_priority():
+    queue = DeliveryQueue(max_per_cycle=0, weight_boost_hours=1.0)
+    queue.push(make_item("plain", 1))
+    queue.push(make_item("weighted", 3, weight=4.0))
+
+    assert titles(queue.pop_batch()) == ["weighted", "plain"]
+
+
+def test_duplicates_are_ignored():
+    queue = DeliveryQueue()
+    assert queue.push(make_item("a", 1))
+    assert not queue.push(make_item("a", 1))
+    assert len(queue) == 1
+
+
+def test_expired_items_rejected_on_push():
+    queue = DeliveryQueue(max_age_hours=5)
+    assert not queue.push(make_item("old", 6))
+    assert len(queue) == 0
+
+
+def test_expired_items_dropped_on_pop():
+    queue = DeliveryQueue(max_per_cycle=0, max_age_hours=5)
+    item = make_item("aging", 4)
+    queue.push(item)
+    item.published -= timedelta(hours=2)
+
+    assert queue.pop_batch() == []
+    assert len(queue) == 0
+
+
+def test_failed_item_can_be_requeued():
+    queue = DeliveryQueue(max_per_cycle=1, backlog_share=0)
+    queue.push(make_item("a", 1))
+    queue.push(make_item("b", 2))
+
+    batch = queue.pop_batch()
+    assert titles(batch) == ["a"]
+    assert queue.push(batch[0])
+    assert titles(queue.pop_batch()) == ["a"]
+    assert titles(queue.pop_batch()) == ["b"]
+
+
+def test_backlog_drains_under_steady_fresh_load():
+    queue = DeliveryQueue(max_per_cycle=4, backlog_share=0.25)
+    queue.push(make_item("old", 10))
+    for cycle in range(3):
+        for i in range(4):
+            queue.push(make_item(f"new{cycle}-{i}", 1 - cycle * 0.1 - i * 0.01))
+        batch = titles(queue.pop_batch())
+        assert len(batch) == 4
+        if cycle == 0:
+            assert batch[-1] == "old"
+    assert "old" not in titles(queue.pop_batch())
+
+
+def test_small_caps_keep_fresh_priority():
+    queue = DeliveryQueue(max_per_cycle=1, backlog_share=0.25)
+    for i in range(5):
+        queue.push(make_item(f"i{i}", i))
+    assert titles(queue.pop_batch()) == ["i0"]
+    assert titles(queue.pop_batch()) == ["i1"]
+
+    queue = DeliveryQueue(max_per_cycle=2, backlog_share=0.25)
+    for i in range(5):
+        queue.push(make_item(f"i{i}", i))
+    assert titles(queue.pop_batch()) == ["i0", "i4"]
+    assert titles(queue.pop_batch()) == ["i1", "i3"]
+
+
+def test_heaps_do_not_grow_without_bound():
+    for max_per_cycle, backlog_share in [(0, 0.25), (5, 0)]:
+        queue = DeliveryQueue(max_per_cycle=max_per_cycle, backlog_share=backlog_share)
+        for i in range(1000):
+            queue.push(make_item(f"item{i}", 1))
+            queue.pop_batch()
+        assert len(queue) == 0
+        assert len(queue._fresh_heap) <= 2
+        assert len(queue._backlog_heap) <= 2
+
+
+def test_unused_backlog_slots_go_to_fresh_items():
+    queue = DeliveryQueue(max_per_cycle=4, backlog_share=0.5)
+    for i in range(3):
+        queue.push(make_item(f"item{i}", i))
+
+    assert titles(queue.pop_batch()) == ["item0", "item1", "item2"]
+
+
+def test_queue_size_is_capped():
+    queue = DeliveryQueue(max_queue_size=2)
+    queue.push(make_item("b", 2))
+    queue.push(make_item("c", 3))
+    assert not queue.push(make_item("d", 4))
+    assert queue.push(make_item("a", 1))
+
+    assert len(queue) == 2
+    assert titles(queue.pop_batch()) == ["a", "b"]
+
+
+def test_delivery_config_follows_content_time_limit(tmp_path):
+    manager = make_manager(tmp_path, {
+        "feeds": [],
+        "content_time_limit": {"enabled": True, "hours": 12},
+        "delivery": {"max_age_hours": None}
+    })
+    config = manager.get_delivery_config()
+    assert config['max_age_hours'] == 12
+
+    queue = DeliveryQueue(**config)
+    item = make_item("aging", 11)
+    queue.push(item)
+    item.published -= timedelta(hours=2)
+    assert queue.pop_batch() == []
+
+
+def test_delivery_config_defaults_and_invalid_values(tmp_path):
+    manager = make_manager(tmp_path, {"feeds": []})
+    assert manager.get_delivery_config()['max_per_cycle'] == main.DEFAULT_MAX_PER_CYCLE
+
+    manager = make_manager(tmp_path, {
+        "feeds": [],
+        "delivery": {
+            "max_per_cycle": None,
+            "weight_boost_hours": "fast",
+            "backlog_share": 2,
+            "max_queue_size": -1
+        }
+    })
+    config = manager.get_delivery_config()
+    assert config['max_per_cycle'] == main.DEFAULT_MAX_PER_CYCLE
+    assert config['weight_boost_hours'] == main.DEFAULT_WEIGHT_BOOST_HOURS
+    assert config['backlog_share'] == main.DEFAULT_BACKLOG_SHARE
+    assert config['max_queue_size'] == main.DEFAULT_MAX_QUEUE_SIZE
+    assert len(DeliveryQueue(**config).pop_batch()) == 0
+
+
+def test_delivery_config_rejects_zero_and_overflow(tmp_path):
+    manager = make_manager(tmp_path, {
+        "feeds": [],
+        "delivery": {"max_age_hours": 0, "max_per_cycle": 1e999, "max_queue_size": float('inf')}
+    })
+    config = manager.get_delivery_config()
+    assert config['max_age_hours'] is None
+    assert config['max_per_cycle'] == main.DEFAULT_MAX_PER_CYCLE
+    assert config['max_queue_size'] == main.DEFAULT_MAX_QUEUE_SIZE
+    assert DeliveryQueue(**config).push(make_item("a", 1))
+
+
+def test_delivery_config_validates_content_time_limit(tmp_path):
+    manager = make_manager(tmp_path, {
+        "feeds": [],
+        "content_time_limit": {"enabled": True, "hours": "soon"}
+    })
+    assert manager.get_delivery_config()['max_age_hours'] == 24
+
+    manager = make_manager(tmp_path, {
+        "feeds": [],
+        "content_time_limit": {"enabled": True, "hours": "12"}
+    })
+    assert manager.get_delivery_config()['max_age_hours'] == 12.0
+
+
+def test_run_once_retries_failed_item_without_duplicates(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('TELEGRAM_BOT_TOKEN', 'token')
+    monkeypatch.setenv('TELEGRAM_CHAT_ID', 'chat')
+
+    async def no_sleep(seconds):
+        pass
+
+    monkeypatch.setattr(main.asyncio, 'sleep', no_sleep)
+
+    bot = RSSBot()
+    bot.delivery_queue = DeliveryQueue(max_per_cycle=0)
+    items = [make_item("a", 1), make_item("b", 2)]
+    bot.rss_manager.get_new_items = lambda: [
+        item for item in items if not bot.rss_manager._is_item_processed(item)
+    ]
+
+    sent = []
+    failures = {"b"}
+
+    async def send_message(text):
+        title = text.split("\n", 1)[0]
+        sent.append(title)
+        if title in failures:
+            failures.discard(title)
+            return False
+        return True
+
+    bot.telegram_bot.send_message = send_message
+
+    asyncio.run(bot.run_once())
+    assert sent == ["a", "b"]
+    assert len(bot.delivery_queue) == 1
+
+    asyncio.run(bot.run_once())
+    assert sent == ["a", "b", "b"]
+    assert len(bot.delivery_queue) == 0
+
+    asyncio.run(bot.run_once())
+    assert sent == ["a", "b", "b"]
+
+
+def test_invalid_feed_weight_falls_back(tmp_path):
+    manager = make_manager(tmp_path, {"feeds": []})
+    assert manager._get_feed_weight({"name": "坏权重", "weight": "heavy"}) == 1.0
+    assert manager._get_feed_weight({"name": "负权重", "weight": -1}) == 1.0
+    assert manager._get_feed_weight({"name": "正常", "weight": 2}) == 2.0